@@ -5,11 +5,12 @@ from django.contrib import admin
 from django.contrib.admin import ModelAdmin
 from django.contrib.admin.widgets import FilteredSelectMultiple
 from django.contrib.auth import get_user_model
-from django.contrib.auth.models import Group
+from django.contrib.auth.models import Group, Permission
 from django.db import models
+from django.db.models import Prefetch
 from django.db.models.fields import related
 from django.forms import ModelForm, ModelMultipleChoiceField
-from django.utils.html import escape
+from django.utils.html import format_html, format_html_join
 from django.utils.safestring import mark_safe
 
 from rest_base.models import BaseModel, BaseUser
@@ -23,23 +24,26 @@ User: Type[BaseUser] = get_user_model()
 NULL = base_settings.ADMIN_NULL_STRING
 MAX_FOREIGN_OBJECT_PREVIEW = base_settings.MAX_FOREIGN_OBJECT_PREVIEW
 
+LINK_FORMAT = '<a href="{}" target="_blank">{}</a>'
+LINE_BREAK = mark_safe('<br>')
+
+BASE_FIELDS = frozenset(f.name for f in BaseModel._meta.get_fields())
+
+
+def _get_change_view_name(model: Type[models.Model]) -> str:
+    return f'admin:{model._meta.app_label.lower()}_{model._meta.object_name.lower()}_change'
+
 
 def _get_link_method(field: related.ForeignKey):
     field_name = field.name
-    foreign_model = field.remote_field.model
+    view_name = _get_change_view_name(field.remote_field.model)
 
     def link_method(self, instance):
         foreign_instance = getattr(instance, field_name)
         if foreign_instance is None:
             return NULL
 
-        href = urls.reverse(
-            f'admin:{foreign_model._meta.app_label.lower()}_{foreign_model._meta.object_name.lower()}_change',
-            args=[foreign_instance.pk],
-        )
-        instance_str = escape(str(foreign_instance))
-
-        return mark_safe(f'<a href="{href}" target="_blank">{instance_str}</a>')
+        return format_html(LINK_FORMAT, urls.reverse(view_name, args=[foreign_instance.pk]), foreign_instance)
 
     link_method.__name__ = field.name
 
@@ -49,31 +53,33 @@ def _get_link_method(field: related.ForeignKey):
 def _get_multiple_link_method(field: related.ManyToManyField):
     field_name = field.name
     foreign_model = field.remote_field.model
+    view_name = _get_change_view_name(foreign_model)
+    linkable = view_name != 'admin:auth_permission_change'
 
     def link_method(self, instance):
-        link_list = []
-        for foreign_instance in getattr(instance, field_name).all()[:MAX_FOREIGN_OBJECT_PREVIEW]:
-            instance_str = escape(str(foreign_instance))
-            app_label = foreign_model._meta.app_label.lower()
-            object_name = foreign_model._meta.object_name.lower()
-            if app_label == 'auth' and object_name == 'permission':
-                link_list.append(instance_str)
-            else:
-                url = urls.reverse('admin:{}_{}_change'.format(
-                        foreign_model._meta.app_label.lower(), foreign_model._meta.object_name.lower()
-                    ), args=[foreign_instance.pk])
-                link_list.append(f'<a href="{url}" target="_blank">{instance_str}</a>')
-
-        if not link_list:
-            return NULL
+        foreign_instances = getattr(instance, field_name).all()[:MAX_FOREIGN_OBJECT_PREVIEW]
+        if linkable:
+            html = format_html_join(LINE_BREAK, LINK_FORMAT, (
+                (urls.reverse(view_name, args=[foreign_instance.pk]), foreign_instance)
+                for foreign_instance in foreign_instances
+            ))
+        else:
+            html = format_html_join(LINE_BREAK, '{}', ((foreign_instance,) for foreign_instance in foreign_instances))
 
-        return mark_safe('<br>'.join(link_list))
+        return html or NULL
 
     link_method.__name__ = field.name
 
     return link_method
 
 
+def _get_prefetch_queryset_method(prefetch_fields: list):
+    def get_queryset(self, request):
+        return ModelAdmin.get_queryset(self, request).prefetch_related(*prefetch_fields)
+
+    return get_queryset
+
+
 def model_admin(model: Type[models.Model], search_fields: list = None):
     primary_key_display = []
     autocomplete_fields = []
@@ -83,8 +89,8 @@ def model_admin(model: Type[models.Model], search_fields: list = None):
     list_display = []
     list_display_sub = []
     list_display_link = dict()
-
-    base_fields = set(f.name for f in BaseModel._meta.get_fields())
+    select_related_fields = []
+    prefetch_fields = []
 
     for field in model._meta._get_fields(reverse=False):
         if not primary_key_display and field.primary_key:
@@ -94,25 +100,31 @@ def model_admin(model: Type[models.Model], search_fields: list = None):
             autocomplete_fields.append(field.name)
             list_display.append(field.name + '_link')
             list_display_link[field.name + '_link'] = _get_link_method(field)
+            select_related_fields.append(field.name)
         elif isinstance(field, models.ManyToManyField):
             list_display.append(field.name + '_link')
             list_display_link[field.name + '_link'] = _get_multiple_link_method(field)
-        elif field.name in base_fields:
+            prefetch_fields.append(field.name)
+        elif field.name in BASE_FIELDS:
             list_display_sub.append(field.name)
         else:
             list_display.append(field.name)
 
-    return model, type(
-        model.__name__ + 'Admin',
-        (ModelAdmin,),
-        dict(
-            search_fields=search_fields,
-            autocomplete_fields=autocomplete_fields,
+    attrs = dict(
+        search_fields=search_fields,
+        autocomplete_fields=autocomplete_fields,
 
-            list_display=primary_key_display + list_display + list_display_sub,
-            **list_display_link
-        )
+        list_display=tuple(primary_key_display + list_display + list_display_sub),
+        list_select_related=tuple(select_related_fields) or False,
+        **list_display_link
     )
+    if prefetch_fields:
+        attrs['get_queryset'] = _get_prefetch_queryset_method(prefetch_fields)
+
+    return model, type(model.__name__ + 'Admin', (ModelAdmin,), attrs)
+
+
+USER_CHANGE_VIEW_NAME = _get_change_view_name(User)
 
 
 class GroupAdminForm(ModelForm):
@@ -121,7 +133,7 @@ class GroupAdminForm(ModelForm):
         exclude = []
 
     users = ModelMultipleChoiceField(
-         queryset=User.objects.all(),
+         queryset=User.objects.only('pk', User.USERNAME_FIELD),
          required=False,
          widget=FilteredSelectMultiple('users', False)
     )
@@ -129,7 +141,7 @@ class GroupAdminForm(ModelForm):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         if self.instance.pk:
-            self.fields['users'].initial = self.instance.user_set.all()
+            self.fields['users'].initial = self.instance.user_set.values_list('pk', flat=True)
 
     def _save_m2m(self):
         super()._save_m2m()
@@ -143,29 +155,23 @@ class GroupAdmin(ModelAdmin):
 
     search_fields = ['name']
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).prefetch_related(
+            Prefetch('permissions', queryset=Permission.objects.select_related('content_type')),
+            Prefetch('user_set', queryset=User.objects.only('pk', User.USERNAME_FIELD)),
+        )
+
     def permissions_list(self, instance):
-        link_list = []
-        for foreign_instance in instance.permissions.all()[:MAX_FOREIGN_OBJECT_PREVIEW]:
-            link_list.append(escape(str(foreign_instance)))
-        if not link_list:
-            return NULL
-        return mark_safe('<br>'.join(link_list))
+        return format_html_join(LINE_BREAK, '{}', (
+            (permission,) for permission in instance.permissions.all()[:MAX_FOREIGN_OBJECT_PREVIEW]
+        )) or NULL
     permissions_list.__name__ = 'permissions'
 
     def users(self, instance):
-        link_list = []
-        for user in instance.user_set.all()[:MAX_FOREIGN_OBJECT_PREVIEW]:
-            href = urls.reverse(
-                f'admin:{User._meta.app_label.lower()}_{User._meta.object_name.lower()}_change',
-                args=[user.pk],
-            )
-            user_str = escape(str(user))
-
-            link_list.append(f'<a href="{href}" target="_blank">{user_str}</a>')
-
-        if not link_list:
-            return NULL
-        return mark_safe('<br>'.join(link_list))
+        return format_html_join(LINE_BREAK, LINK_FORMAT, (
+            (urls.reverse(USER_CHANGE_VIEW_NAME, args=[user.pk]), user)
+            for user in instance.user_set.all()[:MAX_FOREIGN_OBJECT_PREVIEW]
+        )) or NULL
 
 
 admin.site.unregister(Group)
@@ -1,7 +1,11 @@
-from typing import Type
+import hashlib
+from inspect import isclass
+from threading import Lock
+from typing import Type, Dict
 
 from django.conf import settings
 from django.utils.datastructures import MultiValueDict
+from django.utils.module_loading import import_string
 from rest_framework.authentication import BaseAuthentication, get_authorization_header, SessionAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.request import Request
@@ -14,8 +18,31 @@ try:
 except ImportError:
     jwt = None
 
+JWT_ALGORITHMS = ['HS256']
+USED_BEARER_CACHE_SIZE = base_settings.USED_BEARER_CACHE_SIZE
+
+_jwt = jwt.PyJWT() if jwt is not None else None
+
 __all__ = ['CsrfExemptSessionAuthentication', 'TokenAuthentication']
 
+# digests of bearers whose nonce is already consumed, to reject replays without hitting the database
+_used_bearers: Dict[bytes, None] = dict()
+_used_bearers_lock = Lock()
+
+
+def _mark_bearer_used(bearer_digest: bytes):
+    with _used_bearers_lock:
+        _used_bearers[bearer_digest] = None
+        if len(_used_bearers) > USED_BEARER_CACHE_SIZE:
+            del _used_bearers[next(iter(_used_bearers))]
+
+
+def _query_equals(query, params) -> bool:
+    if isinstance(params, MultiValueDict):
+        return isinstance(query, dict) and len(query) == len(params) and all(
+            key in params and params[key] == value for key, value in query.items())
+    return query == params
+
 
 class CsrfExemptSessionAuthentication(SessionAuthentication):
     def enforce_csrf(self, request: Request):
@@ -32,7 +59,9 @@ class TokenAuthentication(BaseAuthentication):
         if jwt is None:
             raise ImportError(
                 'PyJWT must be installed to use TokenAuthentication. Try `pip install django-rest-base[jwt]`.')
-        if not isinstance(self.model, BaseToken):
+        if isinstance(self.model, str):
+            self.model = import_string(self.model)
+        if not isclass(self.model) or not issubclass(self.model, BaseToken):
             raise RuntimeError(
                 f'BaseToken must be provided to either settings.REST_BASE.AUTHENTICATION_MODEL '
                 f'or {self.__class__.__name__}.model'
@@ -41,14 +70,21 @@ class TokenAuthentication(BaseAuthentication):
         super().__init__(*args, **kwargs)
 
     def authenticate(self, request: Request):
-        auth = get_authorization_header(request).split()
+        auth = get_authorization_header(request)
+        if not auth.startswith(TokenAuthentication.AUTHORIZATION_PREFIX_BYTES):
+            return None
 
-        if not auth or auth[0] != TokenAuthentication.AUTHORIZATION_PREFIX_BYTES:
+        auth = auth.split()
+        if auth[0] != TokenAuthentication.AUTHORIZATION_PREFIX_BYTES:
             return None
 
         if len(auth) != 2:
             raise AuthenticationFailed(detail='Invalid Bearer format.')
 
+        bearer_digest = hashlib.blake2b(auth[1], digest_size=16).digest()
+        if bearer_digest in _used_bearers:
+            raise AuthenticationFailed(detail='Invalid public_key or nonce.')
+
         try:
             jwt_payload = auth[1].decode()
         except UnicodeError:
@@ -58,17 +94,18 @@ class TokenAuthentication(BaseAuthentication):
         public_key = header.get('public_key')
         nonce = header.get('nonce')
 
-        try:
+        if type(nonce) is not int:
+            if not isinstance(nonce, str) or not nonce.isdecimal():
+                raise AuthenticationFailed(detail='Invalid nonce.')
             nonce = int(nonce)
-        except ValueError:
-            raise AuthenticationFailed(detail='Invalid nonce.')
 
-        token = self.model.get(public_key, nonce)
+        token = self.model.get(public_key, nonce, include_user=True)
         if token is None:
             raise AuthenticationFailed(detail='Invalid public_key or nonce.')
+        _mark_bearer_used(bearer_digest)
 
         try:
-            payload = jwt.decode(jwt_payload, token.secret_key, algorithms='HS256')
+            payload = _jwt.decode(jwt_payload, token.secret_key, algorithms=JWT_ALGORITHMS)
         except jwt.exceptions.InvalidTokenError as e:
             if settings.DEBUG:
                 raise AuthenticationFailed(detail=f'Invalid JWT: {e}')
@@ -79,12 +116,8 @@ class TokenAuthentication(BaseAuthentication):
         if query:
             query_params = request.query_params
             data = request.data
-            if isinstance(query_params, MultiValueDict):
-                query_params = query_params.dict()
-            if isinstance(data, MultiValueDict):
-                data = data.dict()
 
-            if (not data and query == query_params) or (not query_params and query == data):
+            if (not data and _query_equals(query, query_params)) or (not query_params and _query_equals(query, data)):
                 return token.user, token
         else:
             if not request.query_params and not request.data:
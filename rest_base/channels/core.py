@@ -1,5 +1,5 @@
 import asyncio
-from queue import SimpleQueue
+from collections import deque, defaultdict
 
 import aioredis
 from channels_redis.core import RedisChannelLayer, ConnectionPool, _wrap_close
@@ -8,68 +8,80 @@ __all__ = ['QueueConnectionPool', 'AutoReconnectRedisChannelLayer']
 
 
 class QueueConnectionPool(ConnectionPool):
+    def __init__(self, host):
+        super().__init__(host)
+        self.in_use_by_loop = defaultdict(set)
+
+    def reset(self):
+        super().reset()
+        self.in_use_by_loop = defaultdict(set)
+
     def _ensure_loop(self, loop):
         if loop is None:
             loop = asyncio.get_event_loop()
 
         if loop not in self.conn_map:
             _wrap_close(loop, self)
-            self.conn_map[loop] = SimpleQueue()
+            self.conn_map[loop] = deque()
 
         return self.conn_map[loop], loop
 
     async def pop(self, loop=None):
         conns, loop = self._ensure_loop(loop)
-        while not conns.empty():
-            conn = conns.get()
+        while conns:
+            conn = conns.popleft()
             try:
                 if not conn.closed:
                     break
             except Exception:
-                conns.put(conn)
+                conns.append(conn)
                 raise
         else:
             conn = await aioredis.create_redis(**self.host, loop=loop)
         self.in_use[conn] = loop
+        self.in_use_by_loop[loop].add(conn)
         return conn
 
     def push(self, conn):
-        loop = self.in_use[conn]
-        del self.in_use[conn]
+        loop = self.in_use.pop(conn)
         if loop is not None:
+            self.in_use_by_loop[loop].discard(conn)
             conns, _ = self._ensure_loop(loop)
-            conns.put(conn)
+            conns.append(conn)
+
+    def conn_error(self, conn):
+        loop = self.in_use.pop(conn)
+        if loop is not None:
+            self.in_use_by_loop[loop].discard(conn)
 
     async def close_loop(self, loop):
         if loop in self.conn_map:
             conns = self.conn_map[loop]
-            while not conns.empty():
-                conn = conns.get()
+            while conns:
+                conn = conns.popleft()
                 try:
                     conn.close()
                     await conn.wait_closed()
                 except Exception:
-                    conns.put(conn)
+                    conns.append(conn)
                     raise
             del self.conn_map[loop]
 
-        for k, v in self.in_use.items():
-            if v is loop:
-                self.in_use[k] = None
-                break
+        for conn in self.in_use_by_loop.pop(loop, ()):
+            self.in_use[conn] = None
 
     async def close(self):
         conn_map = self.conn_map
         in_use = self.in_use
         self.reset()
         for conns in conn_map.values():
-            while not conns.empty():
-                conn = conns.get()
+            while conns:
+                conn = conns.popleft()
                 try:
                     conn.close()
                     await conn.wait_closed()
                 except Exception:
-                    conns.put(conn)
+                    conns.append(conn)
                     raise
         for conn in in_use:
             conn.close()
@@ -8,5 +8,4 @@ __all__ = ['BaseCommand']
 
 class BaseCommand(DjangoBaseCommand, ABC):
     def log(self, *args):
-        _args = [str(s) for s in args]
-        self.stdout.write(f"[{timezone.now().strftime('%Y-%m-%d %H:%M:%S.%f')}] {' '.join(_args)}")
+        self.stdout.write(f"[{timezone.now():%Y-%m-%d %H:%M:%S.%f}] {' '.join(map(str, args))}")
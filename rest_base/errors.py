@@ -1,12 +1,12 @@
 from __future__ import annotations
 
+import sys
 import traceback
-from typing import TypedDict, Literal, Optional, Any
+from typing import TypedDict, Literal, Optional, Any, Callable, Dict, Tuple, Type
 
 from django.conf import settings
 from django.core.exceptions import PermissionDenied
 from django.http import HttpRequest, Http404
-from django.utils.functional import cached_property
 from rest_framework import status
 from rest_framework.exceptions import APIException
 from rest_framework.request import Request
@@ -61,7 +61,7 @@ class Error(APIException):
         error: Error.SerializedDetail
 
     def __new__(
-            cls, *args, code: str = None, str_detail: str = None, extra: Any = None,
+            cls, *args, code: str = None, detail: str = None, extra: Any = None,
             tb: str = None, status_code: int = None,
     ):
         if cls.app is None:
@@ -71,13 +71,13 @@ class Error(APIException):
             app_or_request = args[0]
             if type(app_or_request) is str:
                 app = app_or_request
-            elif isinstance(app_or_request, HttpRequest):
-                app = app_or_request.resolver_match.app_name
-            elif isinstance(app_or_request, Request):
-                app = app_or_request.resolver_match.app_name
+            elif isinstance(app_or_request, (HttpRequest, Request)):
+                resolver_match = getattr(app_or_request, 'resolver_match', None)
+                app = resolver_match.app_name if resolver_match is not None else ''
             else:
                 raise ValueError(
                     f'str, HttpRequest, or Request expected as first argument, but {type(app_or_request)} provided')
+            app = app.lower()
 
             if len(args) == 1 and code is None:
                 code = CODE_UNKNOWN
@@ -87,32 +87,39 @@ class Error(APIException):
                 name = code.replace('::', '')
         else:
             if not args and code is None:
+                # raising or calling an Error class without code creates a fresh instance
                 return super().__new__(cls)
 
             app = cls.app
             code = code or '::'.join(args) or CODE_UNKNOWN
             name = code.replace('::', '')
 
-        _app, _code, _str_detail, _extra, _status_code = app, code, str_detail, extra, status_code
-
-        class SubError(cls):
-            app = _app.lower()
-            code = _code
-            str_detail = _str_detail or cls.str_detail
-            extra = _extra or cls.extra
-            traceback = tb or cls.traceback
-            status_code = _status_code or cls.status_code
-        SubError.__name__ = name
-        SubError.__qualname__ = name
-
-        return SubError
+        # classes without class level attributes are reused, since they are created for each handled exception
+        cacheable = detail is None and extra is None and tb is None and status_code is None
+        if cacheable:
+            error_class = _error_classes.get((cls, app, code))
+            if error_class is not None:
+                return error_class
+
+        error_class = type(cls)(name, (cls,), dict(
+            __module__=cls.__module__,
+            __qualname__=name,
+            app=app,
+            code=code,
+            str_detail=cls.str_detail if detail is None else detail,
+            extra=cls.extra if extra is None else extra,
+            traceback=cls.traceback if tb is None else tb,
+            status_code=status_code or cls.status_code,
+        ))
+        if cacheable:
+            _error_classes[cls, app, code] = error_class
+        return error_class
 
     def __init__(
-            self, *args, code: str = None, detail: str = None, extra: Any = None,
-            tb: str = None, status_code: int = None,
+            self, *, detail: str = None, extra: Any = None, tb: str = None, status_code: int = None,
     ):
         if detail is not None:
-            self.detail = detail
+            self.str_detail = detail
         if extra is not None:
             self.extra = extra
         if tb is not None:
@@ -120,28 +127,33 @@ class Error(APIException):
         if status_code is not None:
             self.status_code = status_code
 
-        super().__init__(self.serialized, self.code)
-
-    def __str__(self):
-        return f'Error ({self._app}::{self._code})'
-
-    def __call__(self, *args, code: str = None, detail: str = None, extra: Any = None, tb: str = None) -> Error:
-        return self.__class__(*args, code=code, detail=detail, extra=extra, tb=tb)
-
-    @cached_property
-    def serialized(self) -> Error.Serialized:
         serialized: Error.Serialized = Error.Serialized(
             error=Error.SerializedDetail(code=self.code)
         )
-
         if self.str_detail is not None:
             serialized['error']['detail'] = self.str_detail
         if self.extra is not None:
             serialized['error']['extra'] = self.extra
         if self.traceback is not None:
             serialized['error']['traceback'] = self.traceback
+        self.serialized = serialized
+
+        super().__init__(serialized, self.code)
+
+    def __str__(self):
+        return f'Error ({self.app}::{self.code})'
+
+    def __call__(self, *, detail: str = None, extra: Any = None, tb: str = None, status_code: int = None) -> Error:
+        return self.__class__(
+            detail=self.str_detail if detail is None else detail,
+            extra=self.extra if extra is None else extra,
+            tb=self.traceback if tb is None else tb,
+            status_code=status_code or self.status_code,
+        )
+
 
-        return serialized
+# (base class, app, code) -> Error subclass
+_error_classes: Dict[Tuple[Type[Error], str, str], Type[Error]] = dict()
 
 
 def sentry_report(
@@ -162,15 +174,13 @@ def sentry_report(
     if level in ('debug', 'info') and not sentry_verbose:
         return
 
-    with sentry_sdk.configure_scope() as scope:
-        scope.set_level(level)
-        try:
-            return sentry_sdk.capture_exception(exc)
-        except Exception as e:
-            print('sentry error:', e)
-            print(traceback.format_exc())
-            if not silent:
-                raise
+    try:
+        return sentry_sdk.capture_exception(exc, level=level)
+    except Exception as e:
+        print('sentry error:', e)
+        print(traceback.format_exc())
+        if not silent:
+            raise
 
 
 class ExceptionHandlerContext(TypedDict):
@@ -180,25 +190,58 @@ class ExceptionHandlerContext(TypedDict):
     request: Request
 
 
-def exception_handler(exc: Exception, context: ExceptionHandlerContext) -> Optional[Response]:
-    if isinstance(exc, Error):
-        sentry_report(exc, level='debug')
+ExceptionHandler = Callable[[Exception, ExceptionHandlerContext], Optional[Response]]
 
-        if settings.DEBUG:
-            if context['request'].content_type.startswith('application/json'):
-                exc = exc(traceback=traceback.format_exc())
-            else:
-                return None
-    elif isinstance(exc, APIException):
-        sentry_report(exc, level='debug')
-        exc = Error(context['request'], exc.__class__.__name__, detail=exc.detail, status_code=exc.status_code)
-    elif not isinstance(exc, (Http404, PermissionDenied)):
-        event_id = sentry_report(exc)
-        event_id = f'event_id: {event_id}' if event_id is not None else None
-
-        if settings.DEBUG:
-            return None
+
+def _handle_error(exc: Error, context: ExceptionHandlerContext) -> Optional[Response]:
+    sentry_report(exc, level='debug')
+
+    if settings.DEBUG:
+        if context['request'].content_type.startswith('application/json'):
+            exc = exc(tb=traceback.format_exc() if sys.exc_info()[0] is not None else None)
         else:
-            exc = Error(context['request'], detail=event_id)
+            return None
+
+    return rest_exception_handler(exc, context)
+
+
+def _handle_api_exception(exc: APIException, context: ExceptionHandlerContext) -> Optional[Response]:
+    sentry_report(exc, level='debug')
+    exc = Error(context['request'], exc.__class__.__name__)(detail=exc.detail, status_code=exc.status_code)
 
     return rest_exception_handler(exc, context)
+
+
+def _handle_unknown_exception(exc: Exception, context: ExceptionHandlerContext) -> Optional[Response]:
+    event_id = sentry_report(exc)
+    event_id = f'event_id: {event_id}' if event_id is not None else None
+
+    if settings.DEBUG:
+        return None
+
+    return rest_exception_handler(Error(context['request'])(detail=event_id), context)
+
+
+def _get_exception_handler(exc_type: Type[Exception]) -> ExceptionHandler:
+    if issubclass(exc_type, (Http404, PermissionDenied)):
+        return rest_exception_handler
+    return _handle_unknown_exception
+
+
+# exception type -> handler, filled on first occurrence of each type other than APIException and Error
+_exception_handlers: Dict[Type[Exception], ExceptionHandler] = dict()
+
+
+def exception_handler(exc: Exception, context: ExceptionHandlerContext) -> Optional[Response]:
+    # Error and APIException are dispatched before the lookup, since Error subclasses may be created per raise
+    if isinstance(exc, Error):
+        return _handle_error(exc, context)
+    if isinstance(exc, APIException):
+        return _handle_api_exception(exc, context)
+
+    exc_type = type(exc)
+    handler = _exception_handlers.get(exc_type)
+    if handler is None:
+        handler = _exception_handlers[exc_type] = _get_exception_handler(exc_type)
+
+    return handler(exc, context)
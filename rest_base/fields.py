@@ -1,10 +1,11 @@
-import secrets
+import base64
+import os
 from abc import ABC
 from inspect import isclass
-from math import ceil
-from typing import Type, Callable, Any
+from itertools import chain
+from typing import Type, Callable, Any, List
 
-from django.db import ProgrammingError, OperationalError
+from django.db import ProgrammingError, OperationalError, connections, router
 from django.db.models import Model, Field
 
 from rest_base.settings import base_settings
@@ -25,6 +26,38 @@ def not_found():
 unique_random = ModuleRegistry('unique_random', default=not_found)
 
 
+def _get_unique_picker(model: Type[Model], field: Field) -> Callable[[List[Any]], Any]:
+    field_name = field.name
+    table = model._meta.db_table
+    column = field.column
+    probe_sql = dict()
+
+    def _get_probe_sql(connection, candidate_cnt: int) -> str:
+        sql = probe_sql.get((connection.alias, candidate_cnt))
+        if sql is None:
+            qn = connection.ops.quote_name
+            sql = probe_sql[(connection.alias, candidate_cnt)] = (
+                f'SELECT {qn(column)} FROM {qn(table)} WHERE {qn(column)} IN ({", ".join(["%s"] * candidate_cnt)})'
+            )
+        return sql
+
+    def _pick_unique(candidates: List[Any]) -> Any:
+        connection = connections[router.db_for_read(model)]
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(_get_probe_sql(connection, len(candidates)), candidates)
+                taken = set(row[0] for row in cursor.fetchall())
+        except ProgrammingError:
+            return candidates[0]
+
+        for val in candidates:
+            if val not in taken:
+                return val
+        raise OperationalError(f'Cannot find unique value of {model.__name__}.{field_name}')
+
+    return _pick_unique
+
+
 class PredefinedDefault(ABC):
     def __init__(self):
         raise ProgrammingError(f'{self.__class__.__name__} must not be initialized')
@@ -61,22 +94,22 @@ class UniqueRandomInt(UniqueRandom):
             raise TypeError(f'{cls.__name__}.max_val must be int but value is {max_val}')
 
         val_gap = max_val - min_val
-        field_name = field.name
         max_collision_check = base_settings.MAX_UNIQUE_COLLISION_CHECK
 
         if val_gap < 1:
             raise ValueError(f'{cls.__name__}.max_val - {cls.__name__}.min_val must be bigger than 0')
 
+        # 64 extra random bits keep the modulo bias negligible unless val_gap is a power of 2, which has none
+        val_len = (val_gap - 1).bit_length() // 8 + (1 if val_gap & (val_gap - 1) == 0 else 9)
+        total_len = val_len * max_collision_check
+
+        pick_unique = _get_unique_picker(model, field)
+
         def _random():
-            val = None
-            try:
-                for _ in range(max_collision_check):
-                    val = secrets.randbelow(val_gap) - min_val
-                    if not model.objects.filter(**{field_name: val}).exists():
-                        return val
-            except ProgrammingError:
-                return val
-            raise OperationalError(f'Cannot find unique value of {model.__name__}.{field_name}')
+            buffer = os.urandom(total_len)
+            return pick_unique([
+                int.from_bytes(buffer[i:i + val_len], 'big') % val_gap + min_val for i in range(0, total_len, val_len)
+            ])
 
         return _random
 
@@ -112,27 +145,27 @@ class UniqueRandomChar(UniqueRandom):
             raise TypeError(
                 f'{model.__name__}.{field_name} must have integer max_length but value is {length}')
 
-        val_len = ceil(length * 3 / 4)
+        # every 3 random bytes encode to 4 url-safe characters without padding
+        val_len = (length + 3) // 4 * 3
+        encoded_len = val_len // 3 * 4
+        total_len = encoded_len * max_collision_check
+
+        pick_unique = _get_unique_picker(model, field)
 
         def _random():
-            val = None
-            try:
-                for _ in range(max_collision_check):
-                    val = secrets.token_urlsafe(val_len)[:length]
-                    if not model.objects.filter(**{field_name: val}).exists():
-                        return val
-            except ProgrammingError:
-                return val
-            raise OperationalError(f'Cannot find unique value of {model.__name__}.{field_name}')
+            encoded = base64.urlsafe_b64encode(os.urandom(val_len * max_collision_check)).decode()
+            return pick_unique([encoded[i:i + length] for i in range(0, total_len, encoded_len)])
 
         return _random
 
 
 def initialize_base_fields(model: Type[Model]) -> None:
-    app_label = model._meta.app_label
-    model_name = model._meta.model_name
+    meta = model._meta
+    app_label = meta.app_label
+    model_name = meta.model_name
 
-    for field in model._meta._get_fields(reverse=False):
+    # fields inherited from concrete parents are already initialized with the parents
+    for field in chain(meta.local_fields, meta.local_many_to_many):
         field_name = field.name
 
         if field.is_relation and field.remote_field.related_name is None:
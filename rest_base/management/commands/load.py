@@ -1,14 +1,67 @@
+import io
 import os
 import time
 from argparse import ArgumentParser
+from datetime import timedelta
+from typing import Any, Dict, List, Tuple, Type
 
 from django.conf import settings
+from django.core import serializers
 from django.core.management import call_command
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Model
 
 from rest_base.commands import BaseCommand
 from rest_base.settings import base_settings
 
 
+def _copy_array(values: list) -> str:
+    return '{' + ','.join(
+        'NULL' if value is None else
+        _copy_array(value) if isinstance(value, list) else
+        '"' + _copy_text(value).replace('\\', '\\\\').replace('"', '\\"') + '"'
+        for value in values
+    ) + '}'
+
+
+def _copy_text(value: Any) -> str:
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, timedelta):
+        return f'{value.total_seconds()} seconds'
+    if isinstance(value, list):
+        return _copy_array(value)
+    if isinstance(value, (bytes, memoryview)):
+        return '\\x' + bytes(value).hex()
+    if hasattr(value, 'adapted') and hasattr(value, 'dumps'):
+        # psycopg2.extras.Json
+        return value.dumps(value.adapted)
+    return str(value)
+
+
+def _copy_value(value: Any) -> str:
+    if value is None:
+        return ''
+    return '"' + _copy_text(value).replace('"', '""') + '"'
+
+
+def _copy_rows(cursor, table: str, columns: List[str], rows: List[List[str]]):
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write(','.join(row))
+        buffer.write('\n')
+    buffer.seek(0)
+    cursor.copy_expert(f'COPY {table} ({", ".join(columns)}) FROM STDIN WITH (FORMAT csv)', buffer)
+
+
+def _insert_rows(model: Type[Model], instances: List[Model], fields: list, database: str, batch_size: int):
+    manager = model._base_manager.using(database)
+    batch_size = batch_size or max(len(instances), 1)
+    for i in range(0, len(instances), batch_size):
+        manager._insert(instances[i:i + batch_size], fields=fields, using=database, raw=True)
+
+
 class Command(BaseCommand):
     help = (
         'Load predefined model instances'
@@ -18,6 +71,22 @@ class Command(BaseCommand):
         parser.add_argument('model', type=str, help='Specifies the model to load in the format of app_label.ModelName')
         parser.add_argument(
             '-f', '--filename', nargs='?', type=str, help='Specifies the file name of dumps (default: ModelName.json)')
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS, help='Specifies the database to load (default: "default")')
+        parser.add_argument(
+            '--copy', action='store_true',
+            help='Insert rows with PostgreSQL COPY instead of loaddata. '
+                 'Target tables must not contain the loaded rows, and model signals are not sent.',
+        )
+        parser.add_argument(
+            '--bulk-create', action='store_true',
+            help='Insert rows with bulk_create instead of loaddata. '
+                 'Target tables must not contain the loaded rows, and model signals are not sent.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=base_settings.DB_BATCH_SIZE,
+            help=f'Specifies the number of rows per INSERT of --bulk-create (default: {base_settings.DB_BATCH_SIZE})',
+        )
 
     def handle(self, *args, **options):
         model: str = options['model']
@@ -35,6 +104,79 @@ class Command(BaseCommand):
         self.log(f'load {model} instances from:')
         self.log(path)
 
-        call_command('loaddata', path)
+        database = options['database']
+        if options['copy'] and connections[database].vendor == 'postgresql':
+            self.copy(path, database)
+        elif options['copy'] or options['bulk_create']:
+            if options['copy']:
+                self.log('COPY is only supported by PostgreSQL, falling back to bulk_create')
+            self.bulk_create(path, database, options['batch_size'])
+        else:
+            call_command('loaddata', path, database=database)
 
         self.log(f'done ({time.time() - t:.2f} s)')
+
+    def read(self, path: str, database: str) -> Tuple[Dict[Type[Model], List[Model]], Dict[Any, List[tuple]]]:
+        instances: Dict[Type[Model], List[Model]] = dict()
+        relations: Dict[Any, List[tuple]] = dict()
+        with open(path, 'r', encoding='utf-8') as f:
+            for deserialized in serializers.deserialize('json', f, using=database):
+                instance = deserialized.object
+                instances.setdefault(instance._meta.concrete_model, []).append(instance)
+
+                for field_name, pks in (deserialized.m2m_data or {}).items():
+                    field = instance._meta.get_field(field_name)
+                    if not field.remote_field.through._meta.auto_created:
+                        continue
+                    relations.setdefault(field, []).extend((instance.pk, pk) for pk in pks)
+
+        return instances, relations
+
+    def bulk_create(self, path: str, database: str, batch_size: int):
+        connection = connections[database]
+        instances, relations = self.read(path, database)
+
+        with transaction.atomic(using=database):
+            for model, model_instances in instances.items():
+                # raw insert keeps the fixture values of auto_now and auto_now_add fields, as loaddata and COPY do
+                _insert_rows(model, model_instances, model._meta.local_concrete_fields, database, batch_size)
+                self.log(f'created {len(model_instances)} {model._meta.verbose_name_plural}')
+
+            for field, field_relations in relations.items():
+                through = field.remote_field.through
+                source_field = through._meta.get_field(field.m2m_field_name())
+                target_field = through._meta.get_field(field.m2m_reverse_field_name())
+                _insert_rows(through, [
+                    through(**{source_field.attname: source, target_field.attname: target})
+                    for source, target in field_relations
+                ], [source_field, target_field], database, batch_size)
+                self.log(f'created {len(field_relations)} {field.model.__name__}.{field.name} relations')
+
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(no_style(), list(instances)):
+                    cursor.execute(sql)
+
+    def copy(self, path: str, database: str):
+        connection = connections[database]
+        qn = connection.ops.quote_name
+        instances, relations = self.read(path, database)
+
+        with transaction.atomic(using=database):
+            with connection.cursor() as cursor:
+                for model, model_instances in instances.items():
+                    fields = model._meta.local_concrete_fields
+                    _copy_rows(cursor, qn(model._meta.db_table), [qn(field.column) for field in fields], [
+                        [_copy_value(field.get_db_prep_save(getattr(instance, field.attname), connection)) for field in fields]
+                        for instance in model_instances
+                    ])
+                    self.log(f'copied {len(model_instances)} {model._meta.verbose_name_plural}')
+
+                for field, field_relations in relations.items():
+                    columns = [qn(field.m2m_column_name()), qn(field.m2m_reverse_name())]
+                    _copy_rows(cursor, qn(field.m2m_db_table()), columns, [
+                        [_copy_value(source), _copy_value(target)] for source, target in field_relations
+                    ])
+                    self.log(f'copied {len(field_relations)} {field.model.__name__}.{field.name} relations')
+
+                for sql in connection.ops.sequence_reset_sql(no_style(), list(instances)):
+                    cursor.execute(sql)
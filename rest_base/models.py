@@ -1,14 +1,16 @@
 from __future__ import annotations
 
 import sys
-from math import log10
 from typing import Optional, Iterable, TypeVar, List, Tuple, Dict, Any, Type
 
 from django import db
 from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.contrib.auth.models import BaseUserManager as DjangoBaseUserManager
-from django.db import models, DatabaseError, transaction
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist
+from django.db import models, migrations, DatabaseError, IntegrityError, transaction
+from django.db.models import signals
 from django.db.models.expressions import RawSQL, F
 from django.db.transaction import Atomic
 from django.utils import timezone
@@ -21,31 +23,46 @@ __all__ = [
     'BaseQuerySet', 'BaseManager',
     'BulkUpdateQuerySet', 'BulkUpdateManager',
     'BaseModel', 'AlreadyLocked', 'semaphore',
-    'BaseUserManager', 'BaseUser', 'BaseToken',
+    'BaseUserManager', 'BaseUser',
+    'BaseTokenQuerySet', 'BaseTokenManager', 'BaseTokenBulkUpdateQuerySet', 'BaseTokenBulkUpdateManager',
+    'BaseToken', 'migrate_nonce',
 ]
 
 Instance = TypeVar('Instance', bound=models.Model)
 
+TOKEN_CACHE_TIMEOUT = base_settings.TOKEN_CACHE_TIMEOUT
+TOKEN_TOUCH_INTERVAL = base_settings.TOKEN_TOUCH_INTERVAL
+NONCE_MAX = base_settings.NONCE_MAX
+NONCE_WINDOW_SIZE = base_settings.NONCE_WINDOW_SIZE
+NONCE_WINDOW_MASK = (1 << NONCE_WINDOW_SIZE) - 1
+
 
 class BaseQuerySet(models.QuerySet):
     def update_or_create(self, defaults: Dict[str, Any] = None, **kwargs):
         defaults = defaults or dict()
         self._for_write = True
+        defaults = {k: v() if callable(v) else v for k, v in defaults.items()}
+
+        upserted = self._upsert(defaults, kwargs)
+        if upserted is not None:
+            return upserted
+
         with transaction.atomic(using=self.db):
             try:
                 obj = self.select_for_update().get(**kwargs)
             except self.model.DoesNotExist:
                 params = self._extract_model_params(defaults, **kwargs)
-                obj, created = self._create_object_from_params(kwargs, params, lock=True)
-                if created:
-                    return obj, created
+                try:
+                    with transaction.atomic(using=self.db):
+                        return self.create(**params), True
+                except IntegrityError:
+                    obj = self.select_for_update().get(**kwargs)
             modified = set()
             for k, v in defaults.items():
                 try:
                     old_v = getattr(obj, k)
                 except AttributeError:
                     continue
-                v = v() if callable(v) else v
                 if old_v != v:
                     setattr(obj, k, v)
                     modified.add(k)
@@ -53,6 +70,92 @@ class BaseQuerySet(models.QuerySet):
                 obj.save(update_fields=modified, using=self.db)
         return obj, False
 
+    def _get_upsert_fields(self, defaults: Dict[str, Any], kwargs: Dict[str, Any]):
+        meta = self.model._meta
+        if self.query.has_filters() or meta.parents:
+            return None
+        if signals.pre_save.has_listeners(self.model) or signals.post_save.has_listeners(self.model):
+            return None
+
+        try:
+            lookup_fields = [meta.pk if name == 'pk' else meta.get_field(name) for name in kwargs]
+            update_fields = [meta.get_field(name) for name in defaults]
+        except FieldDoesNotExist:
+            return None
+        if any(not field.concrete or field.many_to_many for field in (*lookup_fields, *update_fields)):
+            return None
+
+        lookup_names = set(field.name for field in lookup_fields)
+        unique_sets = [{field.name} for field in meta.local_concrete_fields if field.unique]
+        unique_sets += [set(fields) for fields in meta.unique_together]
+        unique_sets += [
+            set(constraint.fields) for constraint in meta.constraints
+            if isinstance(constraint, models.UniqueConstraint) and constraint.condition is None
+        ]
+        if lookup_names not in unique_sets:
+            return None
+
+        return lookup_fields, update_fields
+
+    def _upsert(self, defaults: Dict[str, Any], kwargs: Dict[str, Any]) -> Optional[Tuple[models.Model, bool]]:
+        """
+        Single INSERT ... ON CONFLICT DO UPDATE statement for PostgreSQL, or None when it cannot be used
+        """
+
+        connection = db.connections[self.db]
+        if connection.vendor != 'postgresql':
+            return None
+        upsert_fields = self._get_upsert_fields(defaults, kwargs)
+        if upsert_fields is None:
+            return None
+        lookup_fields, update_fields = upsert_fields
+
+        meta = self.model._meta
+        obj = self.model(**self._extract_model_params(defaults, **kwargs))
+        insert_fields = [
+            field for field in meta.local_concrete_fields
+            if not (field.primary_key and isinstance(field, models.AutoField) and getattr(obj, field.attname) is None)
+        ]
+        insert_values = [field.get_db_prep_save(field.pre_save(obj, True), connection) for field in insert_fields]
+
+        qn = connection.ops.quote_name
+        table = qn(meta.db_table)
+        fields = meta.local_concrete_fields
+        sql = (
+            f'INSERT INTO {table} ({", ".join(qn(field.column) for field in insert_fields)}) '
+            f'VALUES ({", ".join(["%s"] * len(insert_fields))}) '
+            f'ON CONFLICT ({", ".join(qn(field.column) for field in lookup_fields)}) '
+        )
+        if update_fields:
+            update_columns = [qn(field.column) for field in update_fields]
+            set_columns = update_columns + [
+                qn(field.column) for field in fields
+                if getattr(field, 'auto_now', False) and field not in update_fields
+            ]
+            sql += (
+                f'DO UPDATE SET {", ".join(f"{column} = EXCLUDED.{column}" for column in set_columns)} '
+                f'WHERE ({", ".join(f"{table}.{column}" for column in update_columns)}) '
+                f'IS DISTINCT FROM ({", ".join(f"EXCLUDED.{column}" for column in update_columns)}) '
+            )
+        else:
+            sql += 'DO NOTHING '
+        sql += f'RETURNING {", ".join(qn(field.column) for field in fields)}, (xmax = 0)'
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, insert_values)
+            row = cursor.fetchone()
+
+        if row is None:
+            # conflicting row already has the values of defaults
+            return self.get(**kwargs), False
+
+        values = list(row[:-1])
+        for i, field in enumerate(fields):
+            col = field.get_col(meta.db_table)
+            for converter in connection.ops.get_db_converters(col) + field.get_db_converters(connection):
+                values[i] = converter(values[i], col, connection)
+        return self.model.from_db(self.db, [field.attname for field in fields], values), row[-1]
+
 
 class BaseManager(models.Manager):
     def get_queryset(self):
@@ -67,36 +170,92 @@ class BulkUpdateQuerySet(models.QuerySet):
         self._for_write = True
         return models.QuerySet(self.model, using=self.db).bulk_create(objs, batch_size, ignore_conflicts)
 
+    def _lock_pks(self, lock: str) -> Optional[RawSQL]:
+        # rows are locked in the order of pk to avoid deadlocks between concurrent bulk operations
+        try:
+            sql, params = self.order_by('pk').values('pk').query.get_compiler(self.db).as_sql()
+        except EmptyResultSet:
+            return None
+        return RawSQL(f'{sql} {lock}', params)
+
     def update(self, **kwargs) -> int:
         self._for_write = True
-        select_query_set = self.order_by('pk').values('pk')
-        return models.QuerySet(self.model, using=self.db).filter(pk__in=RawSQL(
-            str(select_query_set.query) + ' FOR NO KEY UPDATE', ()
-        )).update(**kwargs)
+        if db.connections[self.db].vendor != 'postgresql':
+            return super().update(**kwargs)
+
+        locked_pks = self._lock_pks('FOR NO KEY UPDATE')
+        if locked_pks is None:
+            return 0
+        return models.QuerySet(self.model, using=self.db).filter(pk__in=locked_pks).update(**kwargs)
     update.alters_data = True
 
     def bulk_update(
             self, objs: Iterable[Instance], fields: Iterable[str],
             batch_size: Optional[int] = base_settings.DB_BATCH_SIZE
-    ):
+    ) -> None:
+        objs = list(objs)
         if not objs:
             return
 
         self._for_write = True
-        pks = [obj.pk for obj in objs]
-        query_set = self.filter(pk__in=pks).order_by('pk')
-        with transaction.atomic():
-            with db.connection.cursor() as cursor:
-                cursor.execute(str(query_set.query) + ' FOR NO KEY UPDATE', ())
-            return models.QuerySet(self.model, using=self.db).bulk_update(objs, fields, batch_size)
+        meta = self.model._meta
+        field_names = list(fields)
+        fields = [meta.get_field(name) for name in field_names]
+        connection = db.connections[self.db]
+        if connection.vendor != 'postgresql' or any(
+                hasattr(getattr(obj, field.attname), 'resolve_expression') for obj in objs for field in fields):
+            models.QuerySet(self.model, using=self.db).bulk_update(objs, field_names, batch_size)
+            return
+
+        if any(not field.concrete or field.many_to_many for field in fields):
+            raise ValueError('bulk_update() can only be used with concrete fields.')
+        if any(field.primary_key for field in fields):
+            raise ValueError('bulk_update() cannot be used with primary key fields.')
+        if any(obj.pk is None for obj in objs):
+            raise ValueError('All bulk_update() objects must have a primary key set.')
+
+        qn = connection.ops.quote_name
+        pk_field = meta.pk
+        table = qn(meta.db_table)
+        pk_column = qn(pk_field.column)
+        columns = [qn(field.column) for field in fields]
+        update_sql_prefix = (
+            f'UPDATE {table} SET ' + ', '.join(f'{column} = data.{column}' for column in columns) + ' FROM (VALUES '
+        )
+        update_sql_suffix = (
+            ') AS data(' + ', '.join((pk_column, *columns)) + f') WHERE {table}.{pk_column} = data.{pk_column}'
+        )
+        row_sql = '(' + ', '.join(f'%s::{field.cast_db_type(connection)}' for field in (pk_field, *fields)) + ')'
+
+        # PostgreSQL accepts at most 65535 parameters per query
+        max_batch_size = 65535 // (len(fields) + 1)
+        batch_size = min(batch_size or max_batch_size, max_batch_size)
+
+        locked_pks = self.filter(pk__in=[obj.pk for obj in objs])._lock_pks('FOR NO KEY UPDATE')
+        if locked_pks is None:
+            return
+
+        with transaction.atomic(using=self.db):
+            with connection.cursor() as cursor:
+                cursor.execute(locked_pks.sql, locked_pks.params)
+                for i in range(0, len(objs), batch_size):
+                    batch = objs[i:i + batch_size]
+                    params = []
+                    for obj in batch:
+                        params.append(pk_field.get_db_prep_save(obj.pk, connection))
+                        params.extend(field.get_db_prep_save(getattr(obj, field.attname), connection) for field in fields)
+                    cursor.execute(update_sql_prefix + ', '.join([row_sql] * len(batch)) + update_sql_suffix, params)
     bulk_update.alters_data = True
 
     def delete(self) -> Tuple[int, Dict[str, int]]:
         self._for_write = True
-        query_set = self.order_by('pk').values('pk')
-        return models.QuerySet(self.model, using=self.db).filter(pk__in=RawSQL(
-            str(query_set.query) + ' FOR UPDATE', ()
-        )).delete()
+        if db.connections[self.db].vendor != 'postgresql':
+            return super().delete()
+
+        locked_pks = self._lock_pks('FOR UPDATE')
+        if locked_pks is None:
+            return 0, dict()
+        return models.QuerySet(self.model, using=self.db).filter(pk__in=locked_pks).delete()
     delete.alters_data = True
     delete.queryset_only = True
 
@@ -106,6 +265,46 @@ class BulkUpdateManager(models.Manager):
         return BulkUpdateQuerySet(self.model, using=self._db, hints=self._hints)
 
 
+class BaseTokenQuerySet(BaseQuerySet):
+    def update(self, **kwargs) -> int:
+        public_keys = list(self.values_list('public_key', flat=True)) if TOKEN_CACHE_TIMEOUT else []
+        updated = super().update(**kwargs)
+        self.model.invalidate_cache(public_keys)
+        return updated
+    update.alters_data = True
+
+
+class BaseTokenManager(BaseManager):
+    def get_queryset(self):
+        return BaseTokenQuerySet(self.model, using=self._db, hints=self._hints)
+
+
+class BaseTokenBulkUpdateQuerySet(BulkUpdateQuerySet):
+    def update(self, **kwargs) -> int:
+        public_keys = list(self.values_list('public_key', flat=True)) if TOKEN_CACHE_TIMEOUT else []
+        updated = super().update(**kwargs)
+        self.model.invalidate_cache(public_keys)
+        return updated
+    update.alters_data = True
+
+    def bulk_update(
+            self, objs: Iterable[Instance], fields: Iterable[str],
+            batch_size: Optional[int] = base_settings.DB_BATCH_SIZE
+    ) -> None:
+        objs = list(objs)
+        public_keys = list(self.model._base_manager.using(self.db).filter(
+            pk__in=[obj.pk for obj in objs],
+        ).values_list('public_key', flat=True)) if TOKEN_CACHE_TIMEOUT and objs else []
+        super().bulk_update(objs, fields, batch_size)
+        self.model.invalidate_cache(public_keys)
+    bulk_update.alters_data = True
+
+
+class BaseTokenBulkUpdateManager(BulkUpdateManager):
+    def get_queryset(self):
+        return BaseTokenBulkUpdateQuerySet(self.model, using=self._db, hints=self._hints)
+
+
 class BaseModelMeta(models.base.ModelBase):
     def __new__(cls, name, bases, attrs, **kwargs):
         abstract = getattr(attrs.get('Meta', None), 'abstract', False)
@@ -148,21 +347,22 @@ class AlreadyLocked(Exception):
 def semaphore(*, block: bool):
     nowait = not block
 
-    def decorator(cls: Type[models.Model]):
-        class Model(cls):
-            def __enter__(self: models.Model):
-                self._atomic: Atomic = transaction.atomic()
-                self._atomic.__enter__()
-                try:
-                    self.__class__.objects.select_for_update(nowait=nowait).get(pk=self.pk)
-                except DatabaseError:
-                    self._atomic.__exit__(*sys.exc_info())
-                    raise AlreadyLocked(self)
+    def __enter__(self: models.Model):
+        self._atomic: Atomic = transaction.atomic()
+        self._atomic.__enter__()
+        try:
+            self.__class__.objects.select_for_update(nowait=nowait).get(pk=self.pk)
+        except DatabaseError:
+            self._atomic.__exit__(*sys.exc_info())
+            raise AlreadyLocked(self)
 
-            def __exit__(self, exc_type, exc_val, exc_tb):
-                return self._atomic.__exit__(exc_type, exc_val, exc_tb)
+    def __exit__(self: models.Model, exc_type, exc_val, exc_tb):
+        return self._atomic.__exit__(exc_type, exc_val, exc_tb)
 
-        return Model
+    def decorator(cls: Type[models.Model]):
+        cls.__enter__ = __enter__
+        cls.__exit__ = __exit__
+        return cls
 
     return decorator
 
@@ -215,8 +415,12 @@ class BaseToken(BaseModel):
     public_key = models.CharField(max_length=40, unique=True, default=UniqueRandomChar)
     secret_key = models.CharField(max_length=40, unique=True, default=UniqueRandomChar)
     duration = models.DurationField()
-    nonce = models.CharField(
-        max_length=int(log10(base_settings.NONCE_MAX) + 1) * base_settings.NONCE_WINDOW_SIZE, default='', blank=True)
+    last_nonce = models.BigIntegerField(default=0)
+    # bit i is set when last_nonce - i is used
+    nonce_bits = models.BigIntegerField(default=0)
+
+    objects = BaseTokenManager()
+    bulk_manager = BaseTokenBulkUpdateManager()
 
     class Meta:
         abstract = True
@@ -240,46 +444,132 @@ class BaseToken(BaseModel):
 
         return token
 
+    @classmethod
+    def _get_cache_key(cls, public_key: str) -> str:
+        return f'rest_base:{cls._meta.label_lower}:{public_key}'
+
+    @classmethod
+    def invalidate_cache(cls, public_keys: Iterable[str]):
+        cache.delete_many([cls._get_cache_key(public_key) for public_key in public_keys])
+
     @classmethod
     def get(cls, public_key: str, next_nonce: int = None, include_user: bool = True) -> Optional[BaseToken]:
         if not public_key:
             return None
 
+        cache_key = cls._get_cache_key(public_key)
+        now = timezone.now()
         try:
-            if include_user:
-                queryset = cls.objects.select_related('user')
-            else:
-                queryset = cls.objects
+            token: Optional[cls] = cache.get(cache_key) if TOKEN_CACHE_TIMEOUT else None
+            cache_hit = token is not None and token.last_modified > now - token.duration and token.user.is_active
+            if not cache_hit:
+                if include_user:
+                    queryset = cls.objects.select_related('user')
+                else:
+                    queryset = cls.objects
 
-            token: cls = queryset.get(
-                public_key=public_key,
-                last_modified__gt=timezone.now() - F('duration'),
-                user__is_active=True,
-            )
+                token = queryset.get(
+                    public_key=public_key,
+                    last_modified__gt=now - F('duration'),
+                    user__is_active=True,
+                )
 
             if next_nonce is None:
-                token.save(update_fields=[])
+                if token.last_modified > now - TOKEN_TOUCH_INTERVAL:
+                    if cache_hit:
+                        return token
+                elif cls._base_manager.filter(pk=token.pk).update(last_modified=now):
+                    token.last_modified = now
+                else:
+                    return None
             else:
-                if not 0 <= next_nonce < base_settings.NONCE_MAX:
+                if not 0 <= next_nonce < NONCE_MAX:
                     return None
 
-                if not token.nonce:
-                    token.nonce = str(next_nonce)
-                else:
-                    nonce_list = [int(n) for n in token.nonce.split(';')]
-
-                    if next_nonce in nonce_list:
-                        return None
-                    if next_nonce < nonce_list[0]:
+                while True:
+                    offset = next_nonce - token.last_nonce
+                    if offset > 0:
+                        last_nonce = next_nonce
+                        if offset < NONCE_WINDOW_SIZE:
+                            nonce_bits = (token.nonce_bits << offset | 1) & NONCE_WINDOW_MASK
+                        else:
+                            nonce_bits = 1
+                    elif -offset < NONCE_WINDOW_SIZE and not token.nonce_bits >> -offset & 1:
+                        last_nonce = token.last_nonce
+                        nonce_bits = token.nonce_bits | 1 << -offset
+                    else:
                         return None
 
-                    nonce_list.append(next_nonce)
-                    nonce_list = sorted(nonce_list)[-base_settings.NONCE_WINDOW_SIZE:]
+                    if cls._base_manager.filter(
+                            pk=token.pk, last_nonce=token.last_nonce, nonce_bits=token.nonce_bits,
+                    ).update(last_nonce=last_nonce, nonce_bits=nonce_bits, last_modified=now):
+                        token.last_nonce, token.nonce_bits, token.last_modified = last_nonce, nonce_bits, now
+                        break
+                    token.refresh_from_db(fields=['last_nonce', 'nonce_bits'])
 
-                    token.nonce = ';'.join(str(n) for n in nonce_list)
-
-                token.save(update_fields=['nonce'])
+            # only tokens with their user are cached, so that cache hits can check is_active
+            if TOKEN_CACHE_TIMEOUT and cls.user.is_cached(token):
+                cache.set(cache_key, token, TOKEN_CACHE_TIMEOUT)
 
             return token
         except cls.DoesNotExist:
             return None
+
+
+def _nonce_window(nonces: List[int]) -> Tuple[int, int]:
+    last_nonce = max(nonces)
+    nonce_bits = 0
+    for nonce in nonces:
+        if last_nonce - nonce < NONCE_WINDOW_SIZE:
+            nonce_bits |= 1 << last_nonce - nonce
+    # nonces below the oldest one in the list were rejected, so they stay used
+    oldest = last_nonce - min(nonces) + 1
+    if oldest < NONCE_WINDOW_SIZE:
+        nonce_bits |= NONCE_WINDOW_MASK & ~((1 << oldest) - 1)
+    return last_nonce, nonce_bits
+
+
+def migrate_nonce(model: str) -> migrations.RunPython:
+    """
+    Migration operation which moves the semicolon-separated nonce of existing tokens into last_nonce and nonce_bits
+    """
+
+    app_label, model_name = model.split('.')
+
+    def forwards(apps, schema_editor):
+        token_model = apps.get_model(app_label, model_name)
+        manager = token_model._base_manager.using(schema_editor.connection.alias)
+        tokens = []
+        for token in manager.exclude(nonce='').only('pk', 'nonce'):
+            token.last_nonce, token.nonce_bits = _nonce_window([int(n) for n in token.nonce.split(';')])
+            tokens.append(token)
+        manager.bulk_update(tokens, ['last_nonce', 'nonce_bits'], batch_size=base_settings.DB_BATCH_SIZE)
+
+    return migrations.RunPython(forwards, migrations.RunPython.noop)
+
+
+_token_models: List[Type[BaseToken]] = []
+
+
+def _invalidate_token_cache(sender: Type[BaseToken], instance: BaseToken, **kwargs):
+    sender.invalidate_cache([instance.public_key])
+
+
+def _invalidate_user_token_cache(sender, instance, update_fields=None, **kwargs):
+    # cache hits trust the cached user, so its tokens are dropped whenever is_active may have changed
+    if update_fields is not None and 'is_active' not in update_fields:
+        return
+    for model in _token_models:
+        model.invalidate_cache(model._base_manager.filter(user=instance).values_list('public_key', flat=True))
+
+
+def _connect_token_cache_signals(sender, **kwargs):
+    if issubclass(sender, BaseToken):
+        _token_models.append(sender)
+        signals.post_save.connect(_invalidate_token_cache, sender=sender)
+        signals.post_delete.connect(_invalidate_token_cache, sender=sender)
+
+
+if TOKEN_CACHE_TIMEOUT:
+    signals.class_prepared.connect(_connect_token_cache_signals)
+    signals.post_save.connect(_invalidate_user_token_cache, sender=settings.AUTH_USER_MODEL)
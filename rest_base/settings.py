@@ -16,6 +16,7 @@ DJANGO_REST_BASE_DEFAULT = {
 
     # authentication
     'AUTHENTICATION_MODEL': None,
+    'USED_BEARER_CACHE_SIZE': 4096,
 
     # errors
     'SENTRY_HOST': None,
@@ -25,11 +26,13 @@ DJANGO_REST_BASE_DEFAULT = {
     'MAX_UNIQUE_COLLISION_CHECK': 16,
     'DB_BATCH_SIZE': 1024,
     'DEFAULT_TOKEN_DURATION': timezone.timedelta(days=1),
+    'TOKEN_TOUCH_INTERVAL': timezone.timedelta(minutes=1),
+    'TOKEN_CACHE_TIMEOUT': 0,  # seconds, caching is disabled when 0
 
     'USERNAME_LENGTH_MAX': 24,
     'PASSWORD_LENGTH_MAX': 128,
 
-    'NONCE_WINDOW_SIZE': 8,
+    'NONCE_WINDOW_SIZE': 8,  # at most 63, the bits of BaseToken.nonce_bits
     'NONCE_MAX': 1 << 31,
 
     # utils
@@ -1,23 +1,22 @@
 import os
+import re
 
 __all__ = ['load']
 
 
+# KEY=value, where the value ends at a comment and surrounding whitespace is ignored
+LINE_REGEX = re.compile(r'^[^\S\n]*([^#=\s]+)[^\S\n]*=[^\S\n]*([^#\n]*?)[^\S\n]*(?:#.*)?$', re.MULTILINE)
+
+
 def load(filename: str):
     with open(filename, 'r', encoding='utf8') as f:
-        for line in f:
-            if '=' not in line:
-                continue
+        content = f.read()
 
+    environ = os.environ
+    for key, value in LINE_REGEX.findall(content):
+        if '{' in value:
             try:
-                line = line[:line.index('#')]
-            except ValueError:
+                value = value.format_map(environ)
+            except KeyError:
                 pass
-            line = line.strip()
-            key, value = line.split('=', 1)
-            if '{' in value:
-                try:
-                    value = value.format(**os.environ)
-                except KeyError:
-                    pass
-            os.environ[key] = value
+        environ[key] = value
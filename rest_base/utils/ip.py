@@ -7,13 +7,15 @@ from rest_base.settings import base_settings
 
 __all__ = ['get_client_ip']
 
+IP_HEADERS = tuple(base_settings.IP_HEADERS)
+
 
 def get_client_ip(request: Union[HttpRequest, Request]) -> Optional[str]:
     meta = request.META
 
-    for key in base_settings.IP_HEADERS:
+    for key in IP_HEADERS:
         ip: str = meta.get(key)
         if ip:
             if ',' in ip:
-                return ip.split(',')[0].strip()
+                return ip.partition(',')[0].strip()
             return ip
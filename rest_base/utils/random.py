@@ -1,38 +1,137 @@
-try:
-    import numpy as np
-except ImportError as e:
-    raise ImportError(
-        'numpy must be installed to use rest_base.utils.random. Try `pip install django-rest-base[random]`.'
-    ) from e
+from functools import lru_cache
+from typing import Callable, Union
 
-from typing import Union
+__all__ = ['seedrandom_int', 'seedrandom', 'seedrandom_v2']
 
-__all__ = ['seedrandom_int', 'seedrandom']
+# shorter seeds are mixed faster by the Python loop than by numpy
+VECTORIZE_MIN_LENGTH = 32
 
-np.warnings.filterwarnings('ignore')
+SPLITMIX64_GAMMA = 0x9E3779B97F4A7C15
+UINT64_MASK = 0xFFFFFFFFFFFFFFFF
 
 
-def _rshift(t: np.int32, n: int) -> np.int32:
-    return np.int32((t % 0x100000000) >> n)
+# numpy and numba are optional and expensive to import, so they are loaded on first use
+@lru_cache(maxsize=None)
+def _get_numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
 
 
-# Mulberry32
+@lru_cache(maxsize=None)
+def _get_seedrandom_codes_nb():
+    global _seedrandom_int_nb
+
+    if _get_numpy() is None:
+        return None
+    try:
+        import numba
+    except ImportError:
+        return None
+
+    # int64 arithmetic wraps in compiled code, which keeps the masked low 32 bits exact
+    _seedrandom_int_nb = numba.njit(nogil=True, cache=True)(seedrandom_int)
+    return numba.njit(nogil=True, cache=True)(_seedrandom_codes)
+
+
+# Mulberry32 on uint32 values, also applicable elementwise to uint64 ndarrays
 def seedrandom_int(seed: int) -> int:
-    t = np.int32((seed + 0x6D2B79F5) % 2147483647)
-    with np.errstate(over='ignore'):
-        t = (t ^ _rshift(t, 15)) * (t | 1)
-        t ^= t + (t ^ _rshift(t, 7)) * (t | 61)
-    return int((t ^ _rshift(t, 14)) % 0x100000000)
+    t = (seed + 0x6D2B79F5) % 2147483647
+    t = ((t ^ t >> 15) * (t | 1)) & 0xFFFFFFFF
+    t ^= (t + (t ^ t >> 7) * (t | 61)) & 0xFFFFFFFF
+    return t ^ t >> 14
+
+
+# SplitMix64 finalizer on uint64 values, also applicable elementwise to uint64 ndarrays
+def _splitmix64(z: int) -> int:
+    z = ((z ^ z >> 30) * 0xBF58476D1CE4E5B9) & UINT64_MASK
+    z = ((z ^ z >> 27) * 0x94D049BB133111EB) & UINT64_MASK
+    return z ^ z >> 31
+
+
+def _mulberry32_source(target: str, value: str) -> str:
+    return (
+        f'    t = ({value} + 0x6D2B79F5) % 2147483647\n'
+        '    t = ((t ^ t >> 15) * (t | 1)) & 0xFFFFFFFF\n'
+        '    t ^= (t + (t ^ t >> 7) * (t | 61)) & 0xFFFFFFFF\n'
+        f'    {target} = t ^ t >> 14\n'
+    )
+
+
+@lru_cache(maxsize=None)
+def _get_seedrandom_str_unrolled(length: int) -> Callable[[str], float]:
+    """
+    _seedrandom_str of a fixed length, unrolled with seedrandom_int inlined
+    """
+
+    codes = [f'c{i}' for i in range(length)]
+    source = f'def _seedrandom_str_unrolled(seed):\n    {", ".join(codes)}, = map(ord, seed)\n'
+    source += _mulberry32_source('h', codes[0])
+    for code in codes[1:]:
+        source += _mulberry32_source('m', code)
+        source += _mulberry32_source('h', '(h ^ m)')
+    source += '    return h / 4294967296\n'
+
+    namespace = dict()
+    exec(source, namespace)
+    return namespace['_seedrandom_str_unrolled']
+
+
+# compiled by _get_seedrandom_codes_nb
+def _seedrandom_codes(first: int, codes) -> int:
+    t = _seedrandom_int_nb(first)
+    for c in codes:
+        t = _seedrandom_int_nb(t ^ _seedrandom_int_nb(c))
+    return t
 
 
 def _seedrandom_str(seed: str) -> float:
-    t = seedrandom_int(ord(seed[0]))
-    for c in seed[1:]:
-        t = seedrandom_int(t ^ seedrandom_int(ord(c)))
-    return int(t) / 4294967296
+    first = ord(seed[0])
+    seedrandom_codes_nb = _get_seedrandom_codes_nb()
+    if seedrandom_codes_nb is not None:
+        np = _get_numpy()
+        codes = np.frombuffer(seed.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+        return seedrandom_codes_nb(first, codes[1:]) / 4294967296
+
+    if len(seed) < VECTORIZE_MIN_LENGTH:
+        return _get_seedrandom_str_unrolled(len(seed))(seed)
+
+    t = seedrandom_int(first)
+    np = _get_numpy()
+    if np is not None:
+        codes = np.frombuffer(seed[1:].encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+        mixed = seedrandom_int(codes.astype(np.uint64)).tolist()
+    else:
+        mixed = map(seedrandom_int, map(ord, seed[1:]))
+    for m in mixed:
+        t = seedrandom_int(t ^ m)
+    return t / 4294967296
 
 
 def seedrandom(seed: Union[int, str]) -> float:
     if isinstance(seed, str):
         return _seedrandom_str(seed)
     return seedrandom_int(seed) / 4294967296
+
+
+def seedrandom_v2(seed: Union[int, str]) -> float:
+    """
+    Unlike seedrandom, characters are mixed independently with their positions and combined by xor,
+    so long string seeds are hashed in a single numpy reduction
+    """
+
+    if isinstance(seed, str):
+        length = len(seed)
+        np = _get_numpy() if length >= VECTORIZE_MIN_LENGTH else None
+        if np is not None:
+            codes = np.frombuffer(seed.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32).astype(np.uint64)
+            positions = np.arange(1, length + 1, dtype=np.uint64) * np.uint64(SPLITMIX64_GAMMA)
+            h = int(np.bitwise_xor.reduce(_splitmix64(codes + positions)))
+        else:
+            h = 0
+            for i, c in enumerate(seed, 1):
+                h ^= _splitmix64((ord(c) + i * SPLITMIX64_GAMMA) & UINT64_MASK)
+        seed = h ^ length
+    return (_splitmix64((seed + SPLITMIX64_GAMMA) & UINT64_MASK) >> 11) / 9007199254740992
@@ -1,17 +1,27 @@
 from __future__ import annotations
 
 import importlib
-import re
 from typing import Union, Any
 
 __all__ = ['ModuleRegistry']
 
 
-MODULE_NAME_REGEX = re.compile(r'^(?:[0-9a-zA-Z_]+\.)+[0-9a-zA-Z_]+$')
+def _is_module_path(val: str) -> bool:
+    return '.' in val and all(map(str.isidentifier, val.split('.')))
+
+
+# resolved values by their strings, failed imports are not cached as they may succeed later
+_resolved = dict()
 
 
 def _try_import(val: str):
-    if MODULE_NAME_REGEX.match(val) is None:
+    try:
+        return _resolved[val]
+    except KeyError:
+        pass
+
+    if not _is_module_path(val):
+        _resolved[val] = val
         return val
 
     path, name = val.rsplit('.', 1)
@@ -19,7 +29,10 @@ def _try_import(val: str):
         module = importlib.import_module(path)
     except ImportError:
         return val
-    return getattr(module, name, val)
+    resolved = getattr(module, name, val)
+    if resolved is not val:
+        _resolved[val] = resolved
+    return resolved
 
 
 class EMPTY:
@@ -31,11 +44,15 @@ class INVALID:
 
 
 class ModuleRegistry:
+    __slots__ = ('name', '_registry', '_default', '_include_module', '_ignore')
+
     def __init__(self, name: str, default: Any = EMPTY, include_module: bool = False):
-        super().__setattr__('name', name)
-        super().__setattr__('_registry', dict())
-        super().__setattr__('_default', default)
-        super().__setattr__('_include_module', include_module)
+        object.__setattr__(self, 'name', name)
+        object.__setattr__(self, '_registry', dict())
+        object.__setattr__(self, '_default', default)
+        object.__setattr__(self, '_include_module', include_module)
+        # missing keys are ignored when a default is given
+        object.__setattr__(self, '_ignore', default is not EMPTY)
 
     def __getattr__(self, name, default=INVALID):
         value = self._registry.get(name, default)
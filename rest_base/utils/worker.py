@@ -1,17 +1,44 @@
+from __future__ import annotations
+
 import inspect
 import multiprocessing
 import os
 import random
 import traceback
-from typing import Callable, Union, Iterable, List, Tuple, Set, Optional
+from multiprocessing.util import Finalize
+from typing import Callable, Union, Iterable, List, Tuple, Optional
 
 from django import db
 from django.db.models import QuerySet
 
 __all__ = ['WorkerPool']
 
-WorkerTask = Set[list]
-Task = Tuple[Callable, Optional[List[WorkerTask]], Optional[int], tuple, dict, str]
+# pushed objects are split into this many chunks per worker, so that idle workers take over the remaining chunks
+CHUNKS_PER_WORKER = 4
+
+Task = Tuple[Callable, bool, Optional[list], Optional[List[Tuple[int, int]]], tuple, dict, str]
+
+
+# the pool being run, inherited by its forked workers so that tasks and their objects are never pickled
+_running_pool: Optional[WorkerPool] = None
+
+
+def _accepts_log(func: Callable) -> bool:
+    try:
+        return 'log' in inspect.signature(func).parameters
+    except ValueError:
+        return False
+
+
+def _init_worker(set_pid: Callable):
+    set_pid(os.getpid())
+    db.connection.connect()
+    Finalize(None, db.connections.close_all, exitpriority=0)
+    _running_pool.dlog('worker spawned')
+
+
+def _run_worker_task(item: Tuple[int, Optional[int], Optional[int]]):
+    _running_pool._run_worker_task(*item)
 
 
 class WorkerPool:
@@ -23,11 +50,12 @@ class WorkerPool:
         self._log = log or print
         self._verbose = verbose
         self._throw = throw
-        self.log(f'WorkerPool (size: {worker_cnt}) generated', debug=True)
+        self.dlog('WorkerPool (size: %d) generated', worker_cnt)
 
         self._tasks: List[Task] = list()
         self._worker_cnt = worker_cnt
         self._blocking = blocking
+        self._barrier = None
 
     def __len__(self):
         return len(self._tasks)
@@ -46,12 +74,19 @@ class WorkerPool:
         else:
             self._log(f'[{self._pid}]', *args)
 
+    def dlog(self, fmt: str, *args):
+        # debug messages are only formatted when verbose
+        if self._verbose:
+            self.log(fmt % args if args else fmt)
+
     def push(
             self, queryset_or_objects: Union[QuerySet, Iterable], func: Callable,
             *args, plural_name: str = None, **kwargs
     ):
-        if type(queryset_or_objects) is QuerySet:
-            objects = list(queryset_or_objects.order_by('?'))
+        if isinstance(queryset_or_objects, QuerySet):
+            # shuffling in memory avoids ORDER BY RANDOM() sorting the whole table
+            objects = list(queryset_or_objects)
+            random.shuffle(objects)
             plural_name = plural_name or queryset_or_objects.model._meta.verbose_name_plural
         else:
             objects = random.sample(queryset_or_objects, k=len(queryset_or_objects))
@@ -60,96 +95,88 @@ class WorkerPool:
         if not objects:
             return
 
-        task_size = (len(objects) + self._worker_cnt - 1) // self._worker_cnt
-        worker_tasks: List[WorkerTask] = list()
-
-        for w in range(self._worker_cnt):
-            worker_tasks.append(set(objects[w * task_size:(w + 1) * task_size]))
-
-        self._tasks.append((func, worker_tasks, task_size, args, kwargs, plural_name))
-        self.log(f'distribute {task_size} / {len(objects)} {plural_name} (func: {func.__name__})', debug=True)
+        # chunk sizes differ by at most one
+        chunk_cnt = min(self._worker_cnt * CHUNKS_PER_WORKER, len(objects))
+        chunk_size, larger_chunk_cnt = divmod(len(objects), chunk_cnt)
+        bounds = list()
+        start = 0
+        for c in range(chunk_cnt):
+            stop = start + chunk_size + (c < larger_chunk_cnt)
+            bounds.append((start, stop))
+            start = stop
+
+        # workers slice their chunks out of objects inherited from the parent instead of receiving copies
+        self._tasks.append((func, _accepts_log(func), objects, bounds, args, kwargs, plural_name))
+        self.dlog(
+            'distribute %d chunks of %d / %d %s (func: %s)',
+            chunk_cnt, chunk_size, len(objects), plural_name, func.__name__,
+        )
 
     def register(self, func: Callable, *args, func_name: str = None, **kwargs):
         func_name = func_name or func.__name__
-        self._tasks.append((func, None, None, args, kwargs, func_name))
-        self.log(f'register {func_name}', debug=True)
+        self._tasks.append((func, _accepts_log(func), None, None, args, kwargs, func_name))
+        self.dlog('register %s', func_name)
+
+    def _run_worker_task(self, task_index: int, start: Optional[int], stop: Optional[int]):
+        func, accepts_log, objects, _, args, kwargs, name = self._tasks[task_index]
+        if accepts_log:
+            kwargs = {**kwargs, 'log': self.log}
+        try:
+            if objects is None:
+                self.log(f'process {name}')
+                func(*args, **kwargs)
+            else:
+                self.dlog('process %s: %d %d', name, start, stop)
+                func(objects[start:stop], *args, **kwargs)
+        except:
+            if self._throw:
+                raise
+            self.log('task failed')
+            self.log(traceback.format_exc())
+        finally:
+            if objects is None:
+                # holds the worker until every worker has taken its share of the registered task
+                self._barrier.wait()
 
     def run(self, set_pid: Callable = None):
+        global _running_pool
+
         if not self._tasks:
-            self.log('no tasks to process', debug=True)
+            self.dlog('no tasks to process')
             return
 
         if set_pid is None:
             set_pid = self._set_pid
 
-        self.log('spawning workers', debug=True)
+        self.dlog('spawning workers')
+
+        # registered tasks run once on every worker, pushed tasks once per chunk on whichever worker is idle
+        task_items = [
+            [(t, None, None)] * self._worker_cnt if bounds is None else [(t, start, stop) for start, stop in bounds]
+            for t, (_, _, _, bounds, *_) in enumerate(self._tasks)
+        ]
 
-        workers_pid = list()
-        worker_task = [multiprocessing.JoinableQueue() for _ in range(self._worker_cnt)]
+        context = multiprocessing.get_context('fork')
+        self._barrier = context.Barrier(self._worker_cnt)
+        _running_pool = self
         db.connections.close_all()
-        for w in range(self._worker_cnt):
-            pid = os.fork()
-            if pid:
-                workers_pid.append(pid)
-                continue
-            try:
-                set_pid(os.getpid())
-                db.connection.connect()
-                self.log('worker spawned', debug=True)
-
-                for func, worker_tasks, task_size, args, kwargs, name in self._tasks:
-                    if self._blocking:
-                        worker_task[w].get()
-                    try:
-                        try:
-                            if 'log' in inspect.signature(func).parameters.keys():
-                                def func_log(*_args, **_kwargs):
-                                    func(*_args, **_kwargs, log=self.log)
-                            else:
-                                func_log = func
-                        except ValueError:
-                            func_log = func
-
-                        if worker_tasks is None:
-                            self.log(f'process {name}')
-                            func_log(*args, **kwargs)
-                        else:
-                            if worker_tasks[w]:
-                                self.log(
-                                    f'process {name}: {w * task_size} {w * task_size + len(worker_tasks[w])}',
-                                    debug=True,
-                                )
-                                func_log(worker_tasks[w], *args, **kwargs)
-                            else:
-                                self.log(f'process {name}: none', debug=True)
-                    except:
-                        if self._throw:
-                            raise
-                        self.log('task failed')
-                        self.log(traceback.format_exc())
-                    finally:
-                        if self._blocking:
-                            worker_task[w].task_done()
-
-                db.connections.close_all()
-            except:
-                self.log('worker failed')
-                self.log(traceback.format_exc())
-            finally:
-                os._exit(0)
-
-        if self._blocking:
-            for _ in range(len(self._tasks)):
-                for w in range(self._worker_cnt):
-                    worker_task[w].put(None)
-                for w in range(self._worker_cnt):
-                    worker_task[w].join()
-                self.log('task_done -> next_task', debug=True)
-
-        for pid in workers_pid:
-            os.waitpid(pid, 0)
-
-        db.connection.connect()
-
-        self._tasks.clear()
-        self.log('all workers done', debug=True)
+        pool = context.Pool(self._worker_cnt, initializer=_init_worker, initargs=(set_pid,))
+        try:
+            if self._blocking:
+                for items in task_items:
+                    pool.map(_run_worker_task, items, chunksize=1)
+                    self.dlog('task_done -> next_task')
+            else:
+                pool.map(_run_worker_task, [item for items in task_items for item in items], chunksize=1)
+            pool.close()
+        except:
+            pool.terminate()
+            raise
+        finally:
+            pool.join()
+            _running_pool = None
+            self._barrier = None
+            db.connection.connect()
+            self._tasks.clear()
+
+        self.dlog('all workers done')
@@ -24,7 +24,7 @@ setuptools.setup(
         'jwt': ['PyJWT'],
         'channels': ['channels==2.3.1'],
         'sentry': ['sentry-sdk'],
-        'random': ['numpy'],
+        'random': ['numba'],
     },
     classifiers=[
         'Development Status :: 4 - Beta',